@@ -5,18 +5,39 @@ Generates pixel art sprites from JSON config and packs into spritesheet
 """
 
 import argparse
+import hashlib
 import json
 import math
 import sys
-from dataclasses import dataclass
+import tempfile
+import zipfile
+from importlib import metadata
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass
+from functools import lru_cache
 from pathlib import Path
 from typing import Dict, List, Tuple, Optional, Any
 
 import numpy as np
 from PIL import Image, ImageDraw
 import jsonschema
+from scipy import ndimage
 from opensimplex import OpenSimplex
 
+def _generator_fingerprint() -> bytes:
+    """Hash of this file plus the versions of libraries that shape its output"""
+    digest = hashlib.blake2b(Path(__file__).read_bytes(), digest_size=16)
+    for package in ("numpy", "scipy", "opensimplex"):
+        try:
+            version = metadata.version(package)
+        except metadata.PackageNotFoundError:
+            version = "unknown"
+        digest.update(f"{package}=={version}".encode())
+    return digest.digest()
+
+# Cached sprites are invalidated whenever this file or those libraries change
+_GENERATOR_FINGERPRINT = _generator_fingerprint()
+
 # ============================================================================
 # Data Models
 # ============================================================================
@@ -51,6 +72,7 @@ class CharacterConfig(AssetConfig):
 # Utility Functions
 # ============================================================================
 
+@lru_cache(maxsize=256)
 def hex_to_rgba(hex_color: str) -> Tuple[int, int, int, int]:
     """Convert #RRGGBB or #RRGGBBAA to RGBA tuple"""
     hex_color = hex_color.lstrip('#')
@@ -74,84 +96,48 @@ def rgb_to_hex(rgb: Tuple[int, int, int]) -> str:
     """Convert RGB tuple to hex string"""
     return f"#{rgb[0]:02x}{rgb[1]:02x}{rgb[2]:02x}"
 
-def hsl_to_rgb(h: float, s: float, l: float) -> Tuple[int, int, int]:
-    """Convert HSL to RGB (0-1 ranges)"""
-    if s == 0:
-        r = g = b = l
-    else:
-        def hue_to_rgb(p, q, t):
-            if t < 0:
-                t += 1
-            if t > 1:
-                t -= 1
-            if t < 1/6:
-                return p + (q - p) * 6 * t
-            if t < 1/2:
-                return q
-            if t < 2/3:
-                return p + (q - p) * (2/3 - t) * 6
-            return p
-        
-        q = l * (1 + s) if l < 0.5 else l + s - l * s
-        p = 2 * l - q
-        r = hue_to_rgb(p, q, h + 1/3)
-        g = hue_to_rgb(p, q, h)
-        b = hue_to_rgb(p, q, h - 1/3)
-    
-    return (int(r * 255), int(g * 255), int(b * 255))
+def hue_rotation_matrix(degrees: float) -> np.ndarray:
+    """Build the luminance-preserving (YIQ) 3x3 hue rotation matrix"""
+    # Negated so positive degrees advance red -> green -> blue, as on the HSL wheel
+    rad = math.radians(-degrees)
+    cos_a = math.cos(rad)
+    sin_a = math.sin(rad)
+    
+    return np.array([
+        [0.299 + 0.701 * cos_a + 0.168 * sin_a, 0.587 - 0.587 * cos_a + 0.330 * sin_a, 0.114 - 0.114 * cos_a - 0.497 * sin_a],
+        [0.299 - 0.299 * cos_a - 0.328 * sin_a, 0.587 + 0.413 * cos_a + 0.035 * sin_a, 0.114 - 0.114 * cos_a + 0.292 * sin_a],
+        [0.299 - 0.300 * cos_a + 1.250 * sin_a, 0.587 - 0.588 * cos_a - 1.050 * sin_a, 0.114 + 0.886 * cos_a - 0.203 * sin_a],
+    ])
+
+def rotate_hue_rgb(rgb: np.ndarray, degrees: float) -> np.ndarray:
+    """Rotate hue of an (n, 3) array of RGB colors, returning uint8"""
+    rotated = np.asarray(rgb, dtype=np.float64) @ hue_rotation_matrix(degrees).T
+    return np.clip(np.rint(rotated), 0, 255).astype(np.uint8)
 
+@lru_cache(maxsize=256)
 def rotate_hue(hex_color: str, degrees: float) -> str:
     """Rotate hue of a color by degrees (0-360)"""
-    # Convert hex to RGB
-    r, g, b, a = hex_to_rgba(hex_color)
-    
-    # Normalize RGB
-    r_norm = r / 255.0
-    g_norm = g / 255.0
-    b_norm = b / 255.0
-    
-    # Find max and min
-    cmax = max(r_norm, g_norm, b_norm)
-    cmin = min(r_norm, g_norm, b_norm)
-    delta = cmax - cmin
-    
-    # Calculate hue
-    if delta == 0:
-        h = 0
-    elif cmax == r_norm:
-        h = ((g_norm - b_norm) / delta) % 6
-    elif cmax == g_norm:
-        h = ((b_norm - r_norm) / delta) + 2
-    else:  # cmax == b_norm
-        h = ((r_norm - g_norm) / delta) + 4
-    
-    h = h * 60  # Convert to degrees
-    s = 0 if cmax == 0 else delta / cmax
-    l = (cmax + cmin) / 2
-    
-    # Rotate hue
-    h = (h + degrees) % 360
-    
-    # Convert back to RGB
-    new_rgb = hsl_to_rgb(h / 360.0, s, l)
-    return rgb_to_hex(new_rgb)
+    r, g, b, _ = hex_to_rgba(hex_color)
+    new_rgb = rotate_hue_rgb([[r, g, b]], degrees)[0]
+    return rgb_to_hex(tuple(int(c) for c in new_rgb))
+
+# sRGB byte -> linear light, built once so luminance never calls pow
+_SRGB_LEVELS = np.arange(256) / 255.0
+_SRGB_LUT = np.where(_SRGB_LEVELS <= 0.03928, _SRGB_LEVELS / 12.92, ((_SRGB_LEVELS + 0.055) / 1.055) ** 2.4)
+
+@lru_cache(maxsize=256)
+def luminance(hex_color: str) -> float:
+    """Relative luminance of a color (WCAG)"""
+    r, g, b, _ = hex_to_rgba(hex_color)
+    return float(0.2126 * _SRGB_LUT[r] + 0.7152 * _SRGB_LUT[g] + 0.0722 * _SRGB_LUT[b])
+
+def palette_luminances(palette: List[str]) -> np.ndarray:
+    """Relative luminance of every palette color, for vectorized ratio checks"""
+    # Palettes repeat across assets and variants, so go through the cached luminance
+    return np.array([luminance(color) for color in palette])
 
 def check_contrast_ratio(color1: str, color2: str) -> float:
     """Calculate contrast ratio between two colors (WCAG)"""
-    def luminance(hex_color: str) -> float:
-        r, g, b, _ = hex_to_rgba(hex_color)
-        
-        # Convert to relative luminance
-        rsrgb = r / 255.0
-        gsrgb = g / 255.0
-        bsrgb = b / 255.0
-        
-        r = rsrgb / 12.92 if rsrgb <= 0.03928 else ((rsrgb + 0.055) / 1.055) ** 2.4
-        g = gsrgb / 12.92 if gsrgb <= 0.03928 else ((gsrgb + 0.055) / 1.055) ** 2.4
-        b = bsrgb / 12.92 if bsrgb <= 0.03928 else ((bsrgb + 0.055) / 1.055) ** 2.4
-        
-        return 0.2126 * r + 0.7152 * g + 0.0722 * b
-    
     l1 = luminance(color1)
     l2 = luminance(color2)
     
@@ -162,50 +148,45 @@ def check_contrast_ratio(color1: str, color2: str) -> float:
 
 def next_power_of_2(n: float) -> int:
     """Return next power of 2 greater than or equal to n"""
-    return 1 << (int(n) - 1).bit_length()
+    # Round up first: int() would truncate 64.5 to 64 and return 64
+    return 1 << max(math.ceil(n) - 1, 0).bit_length()
 
 def simplex_noise_2d(size: Tuple[int, int], seed: int) -> np.ndarray:
     """Generate 2D simplex noise array"""
     generator = OpenSimplex(seed)
     width, height = size
-    noise = np.zeros((height, width))
     
     scale = 10.0  # Lower = smoother, higher = more detailed
     
-    for y in range(height):
-        for x in range(width):
-            nx = x / width * scale
-            ny = y / height * scale
-            noise[y, x] = generator.noise2(nx, ny)
+    # Evaluate the whole coordinate grid in one call; result is (height, width)
+    xs = np.arange(width, dtype=np.float64) / width * scale
+    ys = np.arange(height, dtype=np.float64) / height * scale
     
-    return noise
+    return generator.noise2array(xs, ys).astype(np.float32)
 
 def detect_edges(grid: np.ndarray) -> np.ndarray:
     """Simple Sobel edge detection"""
     if grid.shape[2] != 4:
         raise ValueError("Grid must have RGBA channels")
     
-    # Convert to grayscale
-    gray = 0.299 * grid[:, :, 0] + 0.587 * grid[:, :, 1] + 0.114 * grid[:, :, 2]
-    
-    # Sobel kernels
-    kernel_x = np.array([[-1, 0, 1], [-2, 0, 2], [-1, 0, 1]])
-    kernel_y = np.array([[-1, -2, -1], [0, 0, 0], [1, 2, 1]])
+    # Convert to grayscale with exact integer BT.601 weights, scaled by 1000.
+    # 8-bit approximations (77/150/29) shift edges across the outline threshold.
+    # int32 holds the full Sobel range (8 · 255000).
+    rgb = grid[:, :, :3].astype(np.int32)
+    gray = 299 * rgb[:, :, 0] + 587 * rgb[:, :, 1] + 114 * rgb[:, :, 2]
     
-    # Pad image
-    padded = np.pad(gray, 1, mode='edge')
+    # Sobel is separable: [1, 2, 1] smoothing ⊗ [-1, 0, 1] derivative.
+    # convolve1d flips its weights, so the derivative is passed reversed.
+    smooth = [1, 2, 1]
+    deriv = [1, 0, -1]
+    edges_x = ndimage.convolve1d(ndimage.convolve1d(gray, smooth, axis=0, mode='nearest'), deriv, axis=1, mode='nearest')
+    edges_y = ndimage.convolve1d(ndimage.convolve1d(gray, smooth, axis=1, mode='nearest'), deriv, axis=0, mode='nearest')
     
-    edges_x = np.zeros_like(gray)
-    edges_y = np.zeros_like(gray)
+    # |Gx| + |Gy| approximates the gradient magnitude well enough for thresholding
+    edges = np.abs(edges_x) + np.abs(edges_y)
     
-    for y in range(gray.shape[0]):
-        for x in range(gray.shape[1]):
-            region = padded[y:y+3, x:x+3]
-            edges_x[y, x] = np.sum(region * kernel_x)
-            edges_y[y, x] = np.sum(region * kernel_y)
-    
-    edges = np.sqrt(edges_x**2 + edges_y**2)
-    edges = np.clip(edges, 0, 255).astype(np.uint8)
+    # Back to 8-bit gray units
+    edges = np.clip(edges // 1000, 0, 255).astype(np.uint8)
     
     return edges
 
@@ -250,134 +231,230 @@ def validate_config(config_data: Dict) -> List[str]:
                 min_contrast = 1.8
             
             # Check adjacent colors only
-            for i in range(len(palette) - 1):
-                ratio = check_contrast_ratio(palette[i], palette[i + 1])
-                if ratio < min_contrast:
-                    errors.append(f"{asset_name}: Palette colors need better contrast (ratio {ratio:.1f}:1, need {min_contrast}:1)")
+            lum = palette_luminances(palette)
+            lighter = np.maximum(lum[:-1], lum[1:])
+            darker = np.minimum(lum[:-1], lum[1:])
+            ratios = (lighter + 0.05) / (darker + 0.05)
+            
+            for ratio in ratios[ratios < min_contrast]:
+                errors.append(f"{asset_name}: Palette colors need better contrast (ratio {ratio:.1f}:1, need {min_contrast}:1)")
     
     return errors
 
-def generate_pixel_grid(config: AssetConfig, variant_idx: int = 0) -> np.ndarray:
-    """Generate a single pixel grid from config"""
+def palette_to_lut(palette: List[str]) -> np.ndarray:
+    """Parse a hex palette into an (n, 4) uint8 RGBA lookup table"""
+    return np.array([hex_to_rgba(color) for color in palette], dtype=np.uint8)
+
+def variant_lut(palette_lut: np.ndarray, variant_idx: int) -> np.ndarray:
+    """Hue-rotate a palette LUT by 30° per variant, keeping alpha"""
+    lut = palette_lut.copy()
+    lut[:, :3] = rotate_hue_rgb(palette_lut[:, :3], 30 * variant_idx)
+    return lut
+
+def _index_dtype(palette_size: int) -> np.dtype:
+    """Smallest unsigned dtype that can index a palette of this size"""
+    return np.min_scalar_type(max(palette_size - 1, 0))
+
+def _inner_rect_mask(width: int, height: int, max_y: float) -> np.ndarray:
+    """Mask of the rectangle inset 2px from each edge, cut off at max_y"""
+    ys, xs = np.ogrid[:height, :width]
+    return (xs >= 2) & (xs < width - 2) & (ys >= 2) & (ys < height - 2) & (ys < max_y)
+
+def _gen_tile(config: AssetConfig) -> Tuple[np.ndarray, List[str]]:
+    """Tile: simplex noise quantized to palette indices"""
     width, height = config.size
+    palette = config.palette.copy()
+    
+    # Generate noise pattern
+    if config.noise_seed is None:
+        # Stable across processes, unlike str hash() under PYTHONHASHSEED
+        seed = int(hashlib.blake2b(config.name.encode(), digest_size=4).hexdigest(), 16) % 1000
+    else:
+        seed = config.noise_seed
     
-    # Step 1: Create base grid
-    grid = np.zeros((height, width, 4), dtype=np.uint8)
+    noise = simplex_noise_2d((width, height), seed)
     
-    # Step 2: Apply variant palette rotation if needed
+    # Map noise [-1, 1] to palette indices in place (no float temporaries)
+    noise += 1
+    noise *= len(palette) / 2
+    np.clip(noise, 0, len(palette) - 1, out=noise)
+    
+    return noise.astype(_index_dtype(len(palette))), palette
+
+def _gen_shape(config: AssetConfig) -> Tuple[np.ndarray, List[str]]:
+    """Solid base color with an inner detail rectangle when there is a second color"""
+    width, height = config.size
+    palette = config.palette.copy()
+    
+    index_map = np.zeros((height, width), dtype=_index_dtype(len(palette)))
+    if width >= 8 and height >= 8 and len(palette) > 1:
+        index_map[_inner_rect_mask(width, height, height)] = 1
+    
+    return index_map, palette
+
+def _gen_npc(config: AssetConfig) -> Tuple[np.ndarray, List[str]]:
+    """NPC: body rectangle over the top 70%, hue-shifting the base if needed"""
+    width, height = config.size
     palette = config.palette.copy()
+    
+    # Single-color NPCs get a derived body shade
+    if len(palette) == 1:
+        palette.append(rotate_hue(palette[0], 30))
+    
+    index_map = np.zeros((height, width), dtype=_index_dtype(len(palette)))
+    if width >= 8 and height >= 8:
+        index_map[_inner_rect_mask(width, height, height * 0.7)] = 1
+    
+    return index_map, palette
+
+def _gen_prop(config: AssetConfig) -> Tuple[np.ndarray, List[str]]:
+    """Prop: detail rectangle plus a black Sobel outline"""
+    index_map, palette = _gen_shape(config)
+    
+    edges = detect_edges(apply_palette(index_map, palette_to_lut(palette)))
+    # |Gx| + |Gy| equals the Euclidean magnitude on axis-aligned edges and only
+    # reads higher at corners, so the original threshold still applies
+    outline_mask = edges > 50
+    
+    palette.append("#000000ff")  # Black outline
+    index_map = index_map.astype(_index_dtype(len(palette)), copy=False)
+    index_map[outline_mask] = len(palette) - 1
+    
+    return index_map, palette
+
+_INDEX_MAP_GENERATORS = {
+    "tile": _gen_tile,
+    "npc": _gen_npc,
+    "prop": _gen_prop,
+    "furniture": _gen_prop,
+    "clutter": _gen_prop,
+}
+
+def generate_index_map(config: AssetConfig) -> Tuple[np.ndarray, List[str]]:
+    """Generate the sprite shape as an index map into the returned palette
+    
+    The returned palette may extend config.palette with derived colors
+    (NPC body shade, prop outline). Unknown types get the plain shape.
+    """
+    generator = _INDEX_MAP_GENERATORS.get(config.type, _gen_shape)
+    return generator(config)
+
+def apply_palette(index_map: np.ndarray, palette_lut: np.ndarray) -> np.ndarray:
+    """Expand an index map into an RGBA grid"""
+    return palette_lut[index_map]
+
+def generate_pixel_grid(config: AssetConfig, variant_idx: int = 0) -> np.ndarray:
+    """Generate a single pixel grid from config"""
+    index_map, palette = generate_index_map(config)
+    palette_lut = palette_to_lut(palette)
+    
+    # Apply variant palette rotation if needed
     if variant_idx > 0 and config.type == "npc":
-        # Rotate all colors by 30° per variant
-        palette = [rotate_hue(color, 30 * variant_idx) for color in palette]
-    
-    # Step 3: Generate based on type
-    if config.type == "tile":
-        # Generate noise pattern
-        if config.noise_seed is None:
-            seed = hash(config.name) % 1000
+        palette_lut = variant_lut(palette_lut, variant_idx)
+    
+    return apply_palette(index_map, palette_lut)
+
+def generate_sprites(config: AssetConfig) -> Dict[str, np.ndarray]:
+    """Generate an asset's base sprite plus any NPC color variants
+    
+    The shape is generated once; each variant only recolors it.
+    """
+    index_map, palette = generate_index_map(config)
+    palette_lut = palette_to_lut(palette)
+    
+    sprites = {config.name: apply_palette(index_map, palette_lut)}
+    
+    if config.type == "npc":
+        for i in range(1, config.variants):
+            sprites[f"{config.name}_variant_{i}"] = apply_palette(index_map, variant_lut(palette_lut, i))
+    
+    return sprites
+
+def guillotine_pack(rects: List[Tuple[str, int, int]], bin_size: int) -> Optional[Dict[str, Tuple[int, int]]]:
+    """Place (name, w, h) rects in a square bin, or return None if they don't fit
+    
+    Guillotine packing: each rect goes into the free rectangle with the best
+    short-side fit, and the leftover space is split along its shorter axis.
+    """
+    free_rects = [(0, 0, bin_size, bin_size)]
+    placements = {}
+    
+    for name, w, h in rects:
+        best_idx = None
+        best_score = None
+        for i, (fx, fy, fw, fh) in enumerate(free_rects):
+            if w <= fw and h <= fh:
+                score = min(fw - w, fh - h)
+                if best_score is None or score < best_score:
+                    best_idx, best_score = i, score
+        
+        if best_idx is None:
+            return None
+        
+        fx, fy, fw, fh = free_rects.pop(best_idx)
+        placements[name] = (fx, fy)
+        
+        leftover_w = fw - w
+        leftover_h = fh - h
+        if leftover_w < leftover_h:
+            right = (fx + w, fy, leftover_w, h)
+            below = (fx, fy + h, fw, leftover_h)
         else:
-            seed = config.noise_seed
-        
-        noise = simplex_noise_2d((width, height), seed)
+            right = (fx + w, fy, leftover_w, fh)
+            below = (fx, fy + h, w, leftover_h)
         
-        # Map noise [-1, 1] to palette indices
-        noise_normalized = (noise + 1) / 2  # [0, 1]
-        palette_idx = (noise_normalized * len(palette)).astype(int)
-        palette_idx = np.clip(palette_idx, 0, len(palette) - 1)
-        
-        # Fill grid
-        for y in range(height):
-            for x in range(width):
-                color_hex = palette[palette_idx[y, x]]
-                grid[y, x] = hex_to_rgba(color_hex)
-    
-    else:  # prop or npc
-        # Solid fill with first palette color
-        base_color = palette[0]
-        r, g, b, a = hex_to_rgba(base_color)
-        grid[:, :, 0] = r
-        grid[:, :, 1] = g
-        grid[:, :, 2] = b
-        grid[:, :, 3] = a if a < 255 else 255
-        
-        # Add simple shape for props/npcs
-        if width >= 8 and height >= 8:
-            # Draw a simple rectangle/ellipse
-            for y in range(height):
-                for x in range(width):
-                    if (2 <= x < width - 2 and 2 <= y < height - 2):
-                        if config.type == "npc":
-                            # NPC: body shape
-                            if y < height * 0.7:  # Body
-                                if len(palette) > 1:
-                                    color_hex = palette[1]
-                                else:
-                                    color_hex = rotate_hue(base_color, 30)
-                                grid[y, x] = hex_to_rgba(color_hex)
-                        else:
-                            # Prop: inner detail
-                            if len(palette) > 1:
-                                color_hex = palette[1]
-                                grid[y, x] = hex_to_rgba(color_hex)
-    
-    # Step 4: Edge detection for props
-    if config.type in ["prop", "furniture", "clutter"]:
-        edges = detect_edges(grid)
-        outline_mask = edges > 50
-        
-        for y in range(height):
-            for x in range(width):
-                if outline_mask[y, x]:
-                    grid[y, x, :3] = 0  # Black outline
-                    grid[y, x, 3] = 255
+        free_rects.extend(r for r in (right, below) if r[2] > 0 and r[3] > 0)
     
-    return grid
+    return placements
 
-def pack_sprites(sprites: Dict[str, np.ndarray], configs: Dict[str, AssetConfig]) -> Tuple[Image.Image, Dict]:
-    """Pack sprites into atlas using shelf-packing algorithm"""
-    # Sort by height (descending) for optimal packing
+def pack_sprites(sprites: Dict[str, np.ndarray], configs: Dict[str, AssetConfig], pot: bool = True) -> Tuple[Image.Image, Dict]:
+    """Pack sprites into atlas using guillotine packing
+    
+    The atlas is cropped to the packed bounding box, then each side is rounded
+    up to a power of 2 when pot is set.
+    """
+    # Sort by longest side (descending) so awkward sprites are placed first
     sorted_sprites = sorted(
         sprites.items(), 
-        key=lambda x: x[1].shape[0], 
+        key=lambda x: max(x[1].shape[:2]), 
         reverse=True
     )
-    
-    # Calculate total area with 20% padding
-    total_area = 0
-    for name, grid in sorted_sprites:
-        h, w = grid.shape[:2]
-        total_area += w * h
-    
-    atlas_size_float = math.sqrt(total_area) * 1.2
-    atlas_size = next_power_of_2(int(atlas_size_float))
-    
-    # Create atlas
-    atlas = Image.new("RGBA", (atlas_size, atlas_size), (0, 0, 0, 0))
+    rects = [(name, grid.shape[1], grid.shape[0]) for name, grid in sorted_sprites]
+    
+    # An empty config is valid; emit a 1x1 transparent atlas with no frames
+    if not rects:
+        return Image.new("RGBA", (1, 1), (0, 0, 0, 0)), {}
+    
+    # Start from the tightest square that could hold everything
+    total_area = sum(w * h for _, w, h in rects)
+    bin_size = max(math.ceil(math.sqrt(total_area)), max(max(w, h) for _, w, h in rects))
+    if pot:
+        # Packing into a POT bin keeps the rounded atlas no larger than the bin
+        bin_size = next_power_of_2(bin_size)
+    
+    # Place everything first; grow the bin until it all fits
+    placements = guillotine_pack(rects, bin_size)
+    while placements is None:
+        bin_size = bin_size * 2 if pot else math.ceil(bin_size * 1.1)
+        placements = guillotine_pack(rects, bin_size)
+    
+    # Size the atlas from what was actually used, not from the bin
+    atlas_w = max(placements[name][0] + w for name, w, _ in rects)
+    atlas_h = max(placements[name][1] + h for name, _, h in rects)
+    if pot:
+        atlas_w = next_power_of_2(atlas_w)
+        atlas_h = next_power_of_2(atlas_h)
+    
+    # Create atlas buffer (wrapped as a PIL image once packing is done)
+    atlas_buf = np.zeros((atlas_h, atlas_w, 4), dtype=np.uint8)
     frames = {}
     
-    current_x, current_y, row_height = 0, 0, 0
-    
     for name, grid in sorted_sprites:
         h, w = grid.shape[:2]
+        current_x, current_y = placements[name]
         
-        # Check if sprite fits in current row
-        if current_x + w > atlas_size:
-            current_x = 0
-            current_y += row_height
-            row_height = 0
-        
-        # Check if sprite fits vertically
-        if current_y + h > atlas_size:
-            # Expand atlas (shouldn't happen with proper sizing)
-            new_size = next_power_of_2(atlas_size * 1.5)
-            new_atlas = Image.new("RGBA", (new_size, new_size), (0, 0, 0, 0))
-            new_atlas.paste(atlas, (0, 0))
-            atlas = new_atlas
-            atlas_size = new_size
-        
-        # Convert numpy array to PIL Image and paste
-        sprite_img = Image.fromarray(grid, mode="RGBA")
-        atlas.paste(sprite_img, (current_x, current_y), sprite_img)
+        # Blit sprite into its (non-overlapping) slot
+        atlas_buf[current_y:current_y + h, current_x:current_x + w] = grid
         
         # Get anchor from config
         if "_variant_" in name:
@@ -412,9 +489,8 @@ def pack_sprites(sprites: Dict[str, np.ndarray], configs: Dict[str, AssetConfig]
                 "y": anchor_y
             }
         }
-        
-        current_x += w
-        row_height = max(row_height, h)
+    
+    atlas = Image.fromarray(atlas_buf, mode="RGBA")
     
     return atlas, frames
 
@@ -447,10 +523,59 @@ def write_output(atlas: Image.Image, frames: Dict, output_dir: str) -> None:
     with open(manifest_path, 'w') as f:
         json.dump(manifest, f, indent=2)
 
+def sprite_cache_key(config: AssetConfig) -> str:
+    """Stable hash of an asset config plus the generator fingerprint"""
+    digest = hashlib.blake2b(_GENERATOR_FINGERPRINT, digest_size=16)
+    digest.update(json.dumps(asdict(config), sort_keys=True).encode())
+    return digest.hexdigest()
+
+def load_cached_sprites(cache_dir: str, config: AssetConfig) -> Optional[Dict[str, np.ndarray]]:
+    """Return sprites cached for an identical config, or None on a miss"""
+    cache_path = Path(cache_dir) / f"{sprite_cache_key(config)}.npz"
+    if not cache_path.exists():
+        return None
+    
+    # A truncated or foreign file is just a miss; the asset gets regenerated
+    try:
+        with np.load(cache_path) as data:
+            names = data["arr_0"]
+            return {str(name): data[f"arr_{i + 1}"] for i, name in enumerate(names)}
+    except (OSError, ValueError, KeyError, EOFError, zipfile.BadZipFile):
+        return None
+
+def save_cached_sprites(cache_dir: str, config: AssetConfig, sprites: Dict[str, np.ndarray]) -> None:
+    """Cache an asset's sprites; written to a temp file first so readers never see a partial file"""
+    cache_path = Path(cache_dir)
+    cache_path.mkdir(parents=True, exist_ok=True)
+    
+    final_path = cache_path / f"{sprite_cache_key(config)}.npz"
+    
+    # Unique temp name so concurrent runs never write the same file
+    with tempfile.NamedTemporaryFile(dir=cache_path, suffix=".tmp", delete=False) as f:
+        tmp_path = Path(f.name)
+        try:
+            # Names go in positionally too; they may collide with np.savez keywords
+            np.savez(f, np.array(list(sprites)), *sprites.values())
+        except BaseException:
+            f.close()
+            tmp_path.unlink()
+            raise
+    tmp_path.replace(final_path)
+
 # ============================================================================
 # Main Execution
 # ============================================================================
 
+def positive_int(value: str) -> int:
+    """argparse type for counts that must be at least 1"""
+    try:
+        number = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected a positive integer, got {value!r}")
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"expected a positive integer, got {number}")
+    return number
+
 def parse_config(config_data: Dict) -> Dict[str, AssetConfig]:
     """Parse JSON config into AssetConfig objects"""
     configs = {}
@@ -497,6 +622,28 @@ def main():
         default="public/assets/generated",
         help="Output directory (default: public/assets/generated)"
     )
+    parser.add_argument(
+        "--workers",
+        type=positive_int,
+        default=None,
+        help="Worker processes for sprite generation (default: CPU count)"
+    )
+    parser.add_argument(
+        "--cache-dir",
+        type=str,
+        default=".cache/assets",
+        help="Directory for cached sprites (default: .cache/assets)"
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Regenerate every sprite and skip the cache"
+    )
+    parser.add_argument(
+        "--no-pot",
+        action="store_true",
+        help="Size the atlas to the packed sprites instead of powers of 2"
+    )
     
     args = parser.parse_args()
     
@@ -530,26 +677,47 @@ def main():
     print("🎨 Generating sprites...")
     all_sprites = {}
     
+    # Reuse sprites from earlier runs with unchanged configs
+    generated = {}
+    if not args.no_cache:
+        for name, config in configs.items():
+            sprites = load_cached_sprites(args.cache_dir, config)
+            if sprites is not None:
+                generated[name] = sprites
+    cached_names = set(generated)
+    
+    # Assets are independent, so generate the rest in parallel
+    pending = [config for name, config in configs.items() if name not in generated]
+    write_cache = not args.no_cache
+    if pending:
+        with ProcessPoolExecutor(max_workers=args.workers) as executor:
+            for config, sprites in zip(pending, executor.map(generate_sprites, pending)):
+                generated[config.name] = sprites
+                
+                # The cache is an optimization; an unwritable cache dir must not fail the run
+                if write_cache:
+                    try:
+                        save_cached_sprites(args.cache_dir, config, sprites)
+                    except OSError as e:
+                        print(f"⚠️  Could not write sprite cache, continuing without it: {e}")
+                        write_cache = False
+    
     for name, config in configs.items():
-        print(f"  - {name} ({config.type}, {config.size[0]}x{config.size[1]})")
+        cached_note = " [cached]" if name in cached_names else ""
+        print(f"  - {name} ({config.type}, {config.size[0]}x{config.size[1]}){cached_note}")
         
-        # Generate base sprite
-        base_grid = generate_pixel_grid(config)
-        all_sprites[name] = base_grid
+        # Base sprite and NPC variants
+        sprites = generated[name]
+        all_sprites.update(sprites)
         
-        # Generate variants for NPCs
-        if config.type == "npc" and config.variants > 1:
-            for i in range(1, config.variants):
-                variant_name = f"{name}_variant_{i}"
-                variant_grid = generate_pixel_grid(config, i)
-                all_sprites[variant_name] = variant_grid
-                print(f"    → {variant_name}")
+        for variant_name in list(sprites)[1:]:
+            print(f"    → {variant_name}")
     
     print(f"✅ Generated {len(all_sprites)} sprites")
     
     # Pack sprites
     print("📦 Packing sprites into atlas...")
-    atlas, frames = pack_sprites(all_sprites, configs)
+    atlas, frames = pack_sprites(all_sprites, configs, pot=not args.no_pot)
     
     print(f"✅ Packed into {atlas.width}x{atlas.height} atlas")
     
@@ -618,12 +786,7 @@ if __name__ == "__main__":
         
         for name, config in configs.items():
             print(f"  Generating {name}...")
-            all_sprites[name] = generate_pixel_grid(config)
-            
-            if config.type == "npc" and config.variants > 1:
-                for i in range(1, config.variants):
-                    variant_name = f"{name}_variant_{i}"
-                    all_sprites[variant_name] = generate_pixel_grid(config, i)
+            all_sprites.update(generate_sprites(config))
         
         # Pack and write
         atlas, frames = pack_sprites(all_sprites, configs)